@@ -12,7 +12,7 @@ This script:
     Authors: Sankalp Dasari, Aryan Shiva, Ishaan Jain, Sophia Chukka
 """
 
-from rsa import gen_rsa, os2ip, i2osp
+from rsa import gen_rsa, encrypt_bytes
 from rsa_vulnerable import pkcs1_pad, padding_oracle
 from rsa_attacks import bleichenbacher_attack
 
@@ -32,9 +32,7 @@ def main():
 
     # 3. PKCS1 padding and Encryption
     padded = pkcs1_pad(message, k, n)
-    m = os2ip(padded)
-    c = pow(m, e, n)
-    ct = i2osp(c, k)
+    ct = encrypt_bytes(padded, n, e)
     print("Ciphertext generated.")
 
     # 4. Run the attack
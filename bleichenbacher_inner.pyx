@@ -0,0 +1,79 @@
+# cython: language_level=3
+"""
+bleichenbacher_inner.pyx
+------------------------
+
+Optional compiled version of the Bleichenbacher interval update
+(Step 3 of the attack). rsa_attacks.bleichenbacher_attack uses it when
+the extension has been built and falls back to its pure-Python
+implementation otherwise.
+
+Build in place with:
+    cythonize -3 --inplace bleichenbacher_inner.pyx
+
+Authors: Sankalp Dasari, Aryan Shiva, Ishaan Jain, Sophia Chukka
+"""
+
+from bisect import bisect_right
+
+try:
+    from gmpy2 import mpz
+except ImportError:
+    mpz = int
+
+
+def update_intervals(list lo, list hi, s, n, B):
+    """
+    Narrow the interval set M = (lo, hi) given a PKCS-conforming
+    multiplier s, returning the new (lo, hi) lists.
+
+    Produces exactly the same intervals as the pure-Python
+    update_intervals in rsa_attacks.py. Ceilings use integer-only
+    -(-x // y) so no value ever goes through a float.
+    """
+    cdef list new_lo = []
+    cdef list new_hi = []
+    cdef Py_ssize_t j, idx, end
+
+    s = mpz(s)
+    n = mpz(n)
+    B = mpz(B)
+    two_B = 2 * B
+    three_B_m1 = 3 * B - 1
+
+    for j in range(len(lo)):
+        a = mpz(lo[j])
+        b = mpz(hi[j])
+        r = -((three_B_m1 - a * s) // n)
+        r_upper = -((two_B - b * s) // n)
+
+        # rn = r * n, advanced by one addition per r
+        rn = r * n
+        while r < r_upper:
+            lb = -(-(two_B + rn) // s)
+            if lb < a:
+                lb = a
+            ub = (three_B_m1 + rn) // s
+            if ub > b:
+                ub = b
+            if lb <= ub:
+                # Merge on insert, as in rsa_attacks.insert_interval
+                idx = bisect_right(new_lo, lb)
+                if idx and new_hi[idx - 1] >= lb:
+                    idx -= 1
+                    if ub > new_hi[idx]:
+                        new_hi[idx] = ub
+                else:
+                    new_lo.insert(idx, lb)
+                    new_hi.insert(idx, ub)
+                end = idx + 1
+                while end < len(new_lo) and new_lo[end] <= new_hi[idx]:
+                    if new_hi[end] > new_hi[idx]:
+                        new_hi[idx] = new_hi[end]
+                    end += 1
+                del new_lo[idx + 1:end]
+                del new_hi[idx + 1:end]
+            r += 1
+            rn += n
+
+    return [int(a) for a in new_lo], [int(b) for b in new_hi]
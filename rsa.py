@@ -16,8 +16,32 @@ IMPORTANT:
 
 Authors: Sankalp Dasari, Aryan Shiva, Ishaan Jain, Sophia Chukka
 """
+import os
+from multiprocessing import Value
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from secrets import randbits
 
+# gmpy2 is optional: GMP's powmod is much faster than the builtin pow for
+# RSA-sized operands, but everything still works on plain Python ints.
+try:
+    from gmpy2 import mpz, powmod
+    from gmpy2 import gcd as gmpy2_gcd
+    from gmpy2 import gcdext as gmpy2_gcdext
+    from gmpy2 import is_prime as gmpy2_is_prime
+except ImportError:
+    mpz = int
+    powmod = pow
+    gmpy2_gcd = None
+    gmpy2_gcdext = None
+    gmpy2_is_prime = None
+
+# Fixed-window exponentiation (mpz_powm_sec) for secret exponents. The
+# builtin fallback is NOT constant-time.
+try:
+    from gmpy2 import powmod_sec
+except ImportError:
+    powmod_sec = pow
+
 # ============================================================================
 #  BASIC MATH UTILITIES
 # ============================================================================
@@ -33,10 +57,12 @@ Returns:
     int: The greatest common divisor of a and b.
 """
 def gcd(a, b) -> int:
-    
-     while b:
+    if gmpy2_gcd is not None:
+        return int(gmpy2_gcd(a, b))
+
+    while b:
         a, b = b, a % b
-     return abs(a)
+    return abs(a)
 
 """
 Extended Euclidean Algorithm.
@@ -55,6 +81,11 @@ Returns:
         y = Bezout coefficient for b
 """
 def egcd(a, b):
+    # GMP's Lehmer-based extended gcd when available
+    if gmpy2_gcdext is not None:
+        return tuple(map(int, gmpy2_gcdext(a, b)))
+
+    # NOTE: not constant-time; fine for the demo, not for real key material
     x0, x1, y0, y1 = 1, 0, 0, 1
     while b:
         q = a // b
@@ -88,11 +119,100 @@ def modinv(a, m):
 #  MILLER RABIN PRIMALITY TESTING
 # ============================================================================
 """
-Miller–Rabin probabilistic primality test.
+Sieve of Eratosthenes.
+
+Parameters:
+    limit (int)
+
+Returns:
+    list[int]: All primes p < limit, in increasing order.
+"""
+def sieve(limit):
+    is_p = bytearray([1]) * limit
+    is_p[0:2] = b"\x00\x00"
+    for i in range(2, int(limit ** 0.5) + 1):
+        if is_p[i]:
+            is_p[i * i::i] = bytes(len(range(i * i, limit, i)))
+    return [i for i in range(limit) if is_p[i]]
+
+
+# Small primes used for trial division and candidate sieving
+SMALL_PRIMES = sieve(2048)
+
+
+_executor = None
+
+# Id of the current gen_prime search, shared with the pool workers.
+# Windows from an earlier search see a different id and stop early.
+_search_id = None
+
+"""
+Pool initializer: hand the shared search id to each worker.
+"""
+def _init_worker(search_id):
+    global _search_id
+    _search_id = search_id
+
+
+"""
+Return the shared process pool, creating it on first use.
+"""
+def _get_executor():
+    global _executor, _search_id
+    if _executor is None:
+        _search_id = Value("i", 0)
+        _executor = ProcessPoolExecutor(initializer=_init_worker,
+                                        initargs=(_search_id,))
+    return _executor
+
+
+"""
+Single Miller–Rabin round for witness a, where n - 1 = d * 2^s.
+
+Returns:
+    bool: False if a proves n composite, True otherwise.
+"""
+def _mr_witness(a, d, s, n):
+    mp_n = mpz(n)
+    n_minus_1 = mp_n - 1
+    x = powmod(a, d, mp_n)
+    if x == 1 or x == n_minus_1:
+        return True
+    for _ in range(s - 1):
+        # Plain multiply-and-reduce beats pow(x, 2, n) for a fixed square
+        x = (x * x) % mp_n
+        if x == n_minus_1:
+            return True
+    return False
+
+
+"""
+Miller–Rabin test on an odd n that already passed trial division.
+
+Uses GMP's BPSW-based is_prime when gmpy2 is available, and the
+fixed-base Python Miller–Rabin loop otherwise. The bases run
+serially; gen_prime gets its parallelism from searching several
+windows at once instead.
+"""
+def _strong_probable_prime(n):
+    if gmpy2_is_prime is not None:
+        return bool(gmpy2_is_prime(mpz(n), 25))
+    d = n - 1
+    s = 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    bases = [2,3,5,7,11,13,17,19,23]
+    return all(_mr_witness(a, d, s, n) for a in bases)
+
+
+"""
+Probabilistic primality test.
 
-This function returns True for primes and “probably prime”
-composites. For cryptographic key sizes, the bases chosen below
-are sufficient for strong correctness guarantees.
+Trial-divides n by SMALL_PRIMES, then delegates to
+_strong_probable_prime (GMP's BPSW test when gmpy2 is available,
+fixed-base Miller–Rabin otherwise). Returns True for primes and
+“probably prime” composites.
 
 Parameters:
     n (int): Candidate number
@@ -103,33 +223,15 @@ Returns:
 def is_probable_prime(n):
     if n < 2:
         return False
-    small = [2,3,5,7,11,13,17,19,23,29,31,37]
-    for p in small:
+    for p in SMALL_PRIMES:
         if n == p:
             return True
         if n % p == 0:
             return False
-    d = n - 1
-    s = 0
-    while d % 2 == 0:
-        d //= 2
-        s += 1
-    bases = [2,3,5,7,11,13,17,19,23]
-    for a in bases:
-        if a % n == 0:
-            continue
-        x = pow(a, d, n)
-        if x == 1 or x == n - 1:
-            continue
-        ok = False
-        for _ in range(s - 1):
-            x = pow(x, 2, n)
-            if x == n - 1:
-                ok = True
-                break
-        if not ok:
-            return False
-    return True
+    # No prime factor below sqrt(n) means n is prime
+    if n < SMALL_PRIMES[-1] ** 2:
+        return True
+    return _strong_probable_prime(n)
 
 
 # ============================================================================
@@ -151,9 +253,53 @@ def rand_odd_bits(bits):
     x |= 1
     return x
 
+# Odd candidates examined from each random starting point
+SEARCH_WINDOW = 256
+
+# Primes larger than this are searched for by several pool workers at once
+PARALLEL_PRIME_BITS = 256
+
+"""
+    Look for a prime among SEARCH_WINDOW consecutive odd numbers
+    starting at a random odd candidate of the given bit length.
+
+    The remainders of the candidate modulo SMALL_PRIMES are updated
+    incrementally, so composites with a small factor are rejected
+    without any bignum arithmetic. Only survivors reach Miller–Rabin.
+
+    If search is given, the window gives up as soon as the shared
+    search id moves past it (another window already found a prime).
+
+    Returns:
+        int or None: The first probable prime found, or None.
+"""
+def _search_window(bits, search=None):
+    candidate = rand_odd_bits(bits)
+    if candidate <= SMALL_PRIMES[-1]:
+        # Tiny sizes: the sieve would reject the small primes themselves
+        return candidate if is_probable_prime(candidate) else None
+    rems = [candidate % p for p in SMALL_PRIMES]
+    for _ in range(SEARCH_WINDOW):
+        if candidate.bit_length() != bits:
+            return None
+        if search is not None and _search_id.value != search:
+            return None
+        if 0 not in rems and _strong_probable_prime(candidate):
+            return candidate
+        candidate += 2
+        rems = [(r + 2) % p for r, p in zip(rems, SMALL_PRIMES)]
+    return None
+
+
 """
     Generate a prime number of a given bit length.
 
+    On multi-core machines, large primes are searched for in parallel:
+    one window per CPU is submitted to the process pool, the first
+    prime found is returned and the remaining windows are cancelled.
+    Windows that are already running notice the bumped search id and
+    return early, so they don't hold up the next call.
+
     Parameters:
         bits (int): Desired bit length.
 
@@ -161,10 +307,26 @@ def rand_odd_bits(bits):
         int: A probable prime.
 """
 def gen_prime(bits) -> int:
+    workers = os.cpu_count() or 1
+    if workers == 1 or bits <= PARALLEL_PRIME_BITS:
+        while True:
+            candidate = _search_window(bits)
+            if candidate is not None:
+                return candidate
+
+    executor = _get_executor()
+    search = _search_id.value
     while True:
-        candidate = rand_odd_bits(bits)
-        if is_probable_prime(candidate):
-            return candidate
+        futures = [executor.submit(_search_window, bits, search)
+                   for _ in range(workers)]
+        for f in as_completed(futures):
+            candidate = f.result()
+            if candidate is not None:
+                with _search_id.get_lock():
+                    _search_id.value += 1
+                for other in futures:
+                    other.cancel()
+                return candidate
 
 
 # ============================================================================
@@ -183,23 +345,37 @@ def gen_prime(bits) -> int:
             e  (int) — public exponent
             d  (int) — private exponent
             p, q (int) — prime factors of n
+            dp, dq (int) — CRT exponents d mod (p-1), d mod (q-1)
+            qinv (int) — CRT coefficient q^-1 mod p
 """
 def gen_rsa(bits=1024):
     e = 65537 # Standard public exponent
 
     # Split bit size across p and q
-    p = gen_prime(bits // 2)
-    q = gen_prime(bits - bits // 2)
-    while p == q:
-        q = gen_prime(bits - bits // 2)
+    p_bits = bits // 2
+    q_bits = bits - bits // 2
+    p = gen_prime(p_bits)
+    q = gen_prime(q_bits)
+
+    # Ensure e and phi(n) are coprime. gcd(e, phi) = 1 exactly when e is
+    # coprime to both p-1 and q-1, so only the offending prime is replaced.
+    while True:
+        if gcd(e, p - 1) != 1:
+            p = gen_prime(p_bits)
+        elif q == p or gcd(e, q - 1) != 1:
+            q = gen_prime(q_bits)
+        else:
+            break
     n = p * q
     phi = (p - 1) * (q - 1)
-
-    # Ensure e and phi(n) are coprime
-    if gcd(e, phi) != 1:
-        return gen_rsa(bits)
     d = modinv(e, phi)
-    return {"n": n, "e": e, "d": d, "p": p, "q": q}
+
+    # Precompute the CRT parameters used by rsa_decrypt_int_crt
+    dp = d % (p - 1)
+    dq = d % (q - 1)
+    qinv = modinv(q, p)
+    return {"n": n, "e": e, "d": d, "p": p, "q": q,
+            "dp": dp, "dq": dq, "qinv": qinv}
 
 
 # ============================================================================
@@ -242,14 +418,62 @@ def i2osp(x, k):
    RSA encryption: c = m^e mod n
 """
 def rsa_encrypt_int(m, n, e):
-    return pow(m, e, n)
+    return int(powmod(m, e, n))
 
 
 """
     RSA decryption: m = c^d mod n
+    (Uses the constant-time exponentiation, since d is secret. Only
+    when gmpy2 is installed; the builtin fallback is not constant-time.)
 """
 def rsa_decrypt_int(c, n, d):
-    return pow(c, d, n)
+    return rsa_decrypt_int_ct(c, n, d)
+
+
+"""
+    RSA decryption with variable-window exponentiation (fastest).
+    Only safe when d is not secret, e.g. in tests.
+"""
+def rsa_decrypt_int_fast(c, n, d):
+    return int(powmod(c, d, n))
+
+
+"""
+    RSA decryption with fixed-window exponentiation (GMP mpz_powm_sec),
+    whose timing does not depend on the bits of the secret d.
+    Only when gmpy2 is installed; the builtin fallback is not
+    constant-time.
+"""
+def rsa_decrypt_int_ct(c, n, d):
+    return int(powmod_sec(c, d, n))
+
+
+"""
+    RSA decryption using the Chinese Remainder Theorem:
+        m1 = c^dp mod p
+        m2 = c^dq mod q
+        m  = m2 + q * (qinv * (m1 - m2) mod p)
+
+    Each exponentiation works on half-size numbers, so this is roughly
+    4x faster than rsa_decrypt_int. Both use the constant-time
+    exponentiation, since dp and dq are secret. Only when gmpy2 is
+    installed; the builtin fallback is not constant-time.
+
+    If the public exponent e is given, the result is re-encrypted and
+    checked against c before being returned. This blocks the
+    Bellcore/Lenstra fault attack demonstrated in crt.py.
+
+    Raises:
+        ValueError: If verification is requested and fails.
+"""
+def rsa_decrypt_int_crt(c, p, q, dp, dq, qinv, e=None):
+    m1 = powmod_sec(c, dp, p)
+    m2 = powmod_sec(c, dq, q)
+    h = (qinv * (m1 - m2)) % p
+    m = int(m2 + h * q)
+    if e is not None and int(powmod(m, e, p * q)) != c % (p * q):
+        raise ValueError("CRT decryption failed verification")
+    return m
 
 
 """
@@ -272,19 +496,33 @@ def encrypt_bytes(msg, n, e):
 
 """
     Decrypt ciphertext bytes using raw RSA (no padding).
+    Uses the faster CRT path when the prime factors are supplied.
+    Pass the dp, dq and qinv returned by gen_rsa to skip recomputing
+    them on every call.
 
     Parameters:
         ct (bytes)
         n (int)
         d (int)
+        p, q (int, optional): prime factors of n
+        dp, dq, qinv (int, optional): precomputed CRT parameters
 
     Returns:
         bytes: Plaintext block (right-aligned in output).
 """
-def decrypt_bytes(ct, n, d) -> bytes:
+def decrypt_bytes(ct, n, d, p=None, q=None, dp=None, dq=None, qinv=None) -> bytes:
     k = (n.bit_length() + 7) // 8
     c = os2ip(ct)
-    m = rsa_decrypt_int(c, n, d)
+    if p is not None and q is not None:
+        if dp is None:
+            dp = d % (p - 1)
+        if dq is None:
+            dq = d % (q - 1)
+        if qinv is None:
+            qinv = modinv(q, p)
+        m = rsa_decrypt_int_crt(c, p, q, dp, dq, qinv)
+    else:
+        m = rsa_decrypt_int(c, n, d)
     return i2osp(m, k)
 
 
@@ -295,11 +533,13 @@ def decrypt_bytes(ct, n, d) -> bytes:
 if __name__ == "__main__":
     keys = gen_rsa(1024)
     n, e, d = keys["n"], keys["e"], keys["d"]
+    p, q = keys["p"], keys["q"]
+    dp, dq, qinv = keys["dp"], keys["dq"], keys["qinv"]
 
 
     msg = b"hello RSA"
     ct = encrypt_bytes(msg, n, e)
-    pt_block = decrypt_bytes(ct, n, d)
+    pt_block = decrypt_bytes(ct, n, d, p, q, dp, dq, qinv)
 
 
     print("n bits:", n.bit_length())
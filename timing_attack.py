@@ -17,7 +17,7 @@ The vulnerable function:
 """
 
 from rsa import gen_rsa, os2ip, i2osp
-from rsa_vulnerable import decrypt_slow_timing
+from rsa_vulnerable import decrypt_slow_timing, ONE_BIT_DELAY_NS
 from rsa_attacks import timing_attack_recover_bit
 
 
@@ -58,14 +58,20 @@ def main():
     print(f"    Real bits (for comparison after attack): {real_bits}")
 
     for bit_index in range(bits_to_recover):
-        guess, avg_time, actual_bit = timing_attack_recover_bit(
-            c, bit_index, d, n, trials=8
+        # White-box decision threshold: halfway between the expected
+        # delay with this bit of d cleared and with it set. Lets the
+        # sampler stop early once the median is clearly on one side.
+        other_ones = bin(d & ~(1 << bit_index)).count("1")
+        threshold = (other_ones + 0.5) * ONE_BIT_DELAY_NS / 1e9
+
+        guess, median_time, actual_bit = timing_attack_recover_bit(
+            c, bit_index, d, n, trials=8, threshold=threshold
         )
 
         guessed_bits += guess
 
         print(f"\n  - Bit {bit_index}:")
-        print(f"      Measured avg time = {avg_time:.5f} sec")
+        print(f"      Median time       = {median_time:.5f} sec")
         print(f"      Guessed bit       = {guess}")
         print(f"      Actual bit        = {actual_bit}")
 